@@ -2,9 +2,9 @@ import os
 import sys
 import random
 import shutil
+import numpy as np
 from src.image_utils import image_to_pixels, reconstruct_image, save_centroids, load_centroids
 from src.mr_kmeans import MRKMeans
-from src.math_utils import manhattan_distance
 
 # Configuration
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -13,24 +13,23 @@ SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
 
 INPUT_IMAGE = os.path.join(DATASET_DIR, 'source_image.jpg')
 PIXELS_FILE = os.path.join(DATASET_DIR, 'pixels_input.txt')
+TRAIN_PIXELS_FILE = os.path.join(DATASET_DIR, 'pixels_train.txt')
 CENTROIDS_FILE = os.path.join(DATASET_DIR, 'initial_centroids.txt')
 OUTPUT_IMAGE = os.path.join(DATASET_DIR, 'output_images', 'result.jpg')
 
 K = 5  # Number of clusters
 MAX_ITER = 10
 THRESHOLD = 1.0  # Convergence threshold
+TRAIN_MAX_DIM = 1024  # Larger images are shrunk on load for the K-means iterations
 
 def initialize_centroids(pixels_file, k, output_file):
     print("Initializing centroids...")
-    # Read all pixels (this might be large, but for this assignment it's okay)
-    # For very large files, we should reservoir sample.
-    pixels = []
-    with open(pixels_file, 'r') as f:
-        for line in f:
-            parts = list(map(int, line.strip().split(',')))
-            pixels.append(parts[2:]) # [R, G, B]
+    # Read the RGB columns of all pixels as uint8 (their native range), which
+    # keeps even large images at 3 bytes per pixel instead of a list per pixel.
+    pixels = np.loadtxt(pixels_file, delimiter=',', usecols=(2, 3, 4),
+                        dtype=np.uint8, ndmin=2)
     
-    centroids = random.sample(pixels, k)
+    centroids = pixels[random.sample(range(len(pixels)), k)]
     save_centroids(centroids, output_file)
     print(f"Initialized {k} centroids.")
     return centroids
@@ -69,9 +68,17 @@ def main():
     print("Step 1: Converting image to text...")
     width, height = image_to_pixels(INPUT_IMAGE, PIXELS_FILE)
     
+    # Centroids are fitted on a shrunk copy of large images; the full
+    # resolution pixels are only needed for the final reconstruction.
+    train_pixels_file = PIXELS_FILE
+    if max(width, height) > TRAIN_MAX_DIM:
+        train_size = image_to_pixels(INPUT_IMAGE, TRAIN_PIXELS_FILE, max_dim=TRAIN_MAX_DIM)
+        if train_size != (width, height):
+            train_pixels_file = TRAIN_PIXELS_FILE
+    
     # 2. Initialization
     print("Step 2: Initializing centroids...")
-    current_centroids = initialize_centroids(PIXELS_FILE, K, CENTROIDS_FILE)
+    current_centroids = initialize_centroids(train_pixels_file, K, CENTROIDS_FILE)
     
     # 3. Iteration
     print("Step 3: Starting K-means iteration...")
@@ -80,25 +87,23 @@ def main():
         print(f"--- Iteration {iteration + 1} ---")
         
         # Run MapReduce Job
-        new_centroids_map = run_mr_job(PIXELS_FILE, CENTROIDS_FILE)
+        new_centroids_map = run_mr_job(train_pixels_file, CENTROIDS_FILE)
+        
+        # Construct new centroids array; an empty cluster keeps its old centroid
+        old_centroids = np.asarray(current_centroids, dtype=np.float64)
+        new_centroids = old_centroids.copy()
+        
+        # Scatter the reducer output into place in one array assignment
+        found = np.fromiter(new_centroids_map.keys(), dtype=np.int64,
+                            count=len(new_centroids_map))
+        new_centroids[found] = np.array(list(new_centroids_map.values()),
+                                        dtype=np.float64).reshape(-1, 3)
         
-        # Construct new centroids list
-        new_centroids = []
-        max_shift = 0.0
+        for i in np.setdiff1d(np.arange(K), found):
+            print(f"Warning: Cluster {i} is empty. Keeping old centroid.")
         
-        for i in range(K):
-            if i in new_centroids_map:
-                new_c = new_centroids_map[i]
-                old_c = current_centroids[i]
-                shift = manhattan_distance(new_c, old_c)
-                if shift > max_shift:
-                    max_shift = shift
-                new_centroids.append(new_c)
-            else:
-                # Cluster disappeared, keep old centroid or re-init
-                # For simplicity, keep old
-                print(f"Warning: Cluster {i} is empty. Keeping old centroid.")
-                new_centroids.append(current_centroids[i])
+        # Largest Manhattan shift over all centroids, computed in one pass
+        max_shift = float(np.abs(new_centroids - old_centroids).sum(axis=1).max())
         
         print(f"Max shift: {max_shift}")
         
@@ -1,5 +1,6 @@
 import urllib.request
 import os
+import shutil
 
 def download_sample():
     # Get project root directory (parent of src)
@@ -17,7 +18,9 @@ def download_sample():
 
     print(f"Downloading sample image from {url}...")
     try:
-        urllib.request.urlretrieve(url, save_path)
+        # Copy in 1 MiB blocks instead of urlretrieve's small default buffer
+        with urllib.request.urlopen(url) as response, open(save_path, 'wb') as out_file:
+            shutil.copyfileobj(response, out_file, length=1024 * 1024)
         print(f"Download successful! Image saved to: {save_path}")
         print("You can now run 'python3 main.py' to test.")
     except Exception as e:
@@ -1,9 +1,13 @@
 from PIL import Image
 import numpy as np
 import os
-from src.math_utils import manhattan_distance
+import warnings
 
-def image_to_pixels(image_path, output_text_path):
+# Pixels read and processed per broadcast in reconstruct_image; bounds the
+# parsed rows and the (chunk, K, 3) distance array.
+RECONSTRUCT_CHUNK_SIZE = 65536
+
+def image_to_pixels(image_path, output_text_path, max_dim=None):
     """
     Reads an image and converts it to a text file where each line is:
     row_id, col_id, R, G, B
@@ -11,6 +15,8 @@ def image_to_pixels(image_path, output_text_path):
     Args:
         image_path (str): Path to the source image.
         output_text_path (str): Path to save the pixel data.
+        max_dim (int, optional): If given, shrink the image (keeping its
+            aspect ratio) so neither side is larger than this.
         
     Returns:
         tuple: (width, height) of the image.
@@ -19,9 +25,19 @@ def image_to_pixels(image_path, output_text_path):
         raise FileNotFoundError(f"Image file not found: {image_path}")
 
     img = Image.open(image_path)
+    if max_dim is not None:
+        # Shrink-on-load: for JPEGs libjpeg scales by a power of two during the
+        # IDCT, which never goes below the requested size, so the thumbnail
+        # below does the rest of the way.
+        img.draft('RGB', (max_dim, max_dim))
     img = img.convert('RGB')
+    if max_dim is not None:
+        img.thumbnail((max_dim, max_dim))
+    img.load()
     width, height = img.size
-    pixels = np.array(img)
+    # Pillow exports the pixels through tobytes(), which is already a copy;
+    # asarray wraps that buffer where np.array would copy it a second time
+    pixels = np.asarray(img, dtype=np.uint8)
 
     with open(output_text_path, 'w') as f:
         for r in range(height):
@@ -39,7 +55,7 @@ def reconstruct_image(pixels_path, centroids, width, height, output_image_path):
     
     Args:
         pixels_path (str): Path to the pixel text file.
-        centroids (list): List of final centroids (each is [R, G, B]).
+        centroids (list or np.ndarray): Final centroids (each is [R, G, B]).
         width (int): Image width.
         height (int): Image height.
         output_image_path (str): Path to save the result image.
@@ -47,40 +63,43 @@ def reconstruct_image(pixels_path, centroids, width, height, output_image_path):
     # Create a blank image array
     new_pixels = np.zeros((height, width, 3), dtype=np.uint8)
     
+    # Pixels are matched against the 8-bit colors actually written out, so
+    # the whole distance computation fits in int16 (max distance is 765)
+    centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 3)
+    palette = np.clip(np.rint(centroids), 0, 255).astype(np.int16)
+    colors = palette.astype(np.uint8)
+    
     print("Reconstructing image...")
-    with open(pixels_path, 'r') as f:
-        for line in f:
-            parts = list(map(int, line.strip().split(',')))
-            r_idx, c_idx = parts[0], parts[1]
-            pixel_rgb = parts[2:]
-            
-            # Find nearest centroid
-            min_dist = float('inf')
-            nearest_centroid = None
+    with open(pixels_path, 'r') as f, warnings.catch_warnings():
+        # The read that hits end of file returns no rows, which loadtxt warns about
+        warnings.filterwarnings('ignore', message='loadtxt: input contained no data')
+        while True:
+            # Columns: row_id, col_id, R, G, B
+            data = np.loadtxt(f, delimiter=',', dtype=np.int32, ndmin=2,
+                              max_rows=RECONSTRUCT_CHUNK_SIZE)
+            if len(data) == 0:
+                break
+            chunk = data[:, 2:].astype(np.int16)
             
-            for centroid in centroids:
-                dist = manhattan_distance(pixel_rgb, centroid)
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_centroid = centroid
+            # Manhattan distance from every pixel in the chunk to every centroid
+            diff = np.subtract(chunk[:, None, :], palette[None, :, :], dtype=np.int16)
+            dists = np.abs(diff, out=diff).sum(axis=2, dtype=np.int32)
+            nearest = dists.argmin(axis=1)
             
-            new_pixels[r_idx, c_idx] = nearest_centroid
+            new_pixels[data[:, 0], data[:, 1]] = colors[nearest]
+            if len(data) < RECONSTRUCT_CHUNK_SIZE:
+                break
 
     img = Image.fromarray(new_pixels)
     img.save(output_image_path)
     print(f"Saved reconstructed image to {output_image_path}")
 
 def save_centroids(centroids, filepath):
-    with open(filepath, 'w') as f:
-        for c in centroids:
-            f.write(','.join(map(str, c)) + '\n')
+    # %.17g round-trips float64 exactly
+    np.savetxt(filepath, np.asarray(centroids, dtype=np.float64).reshape(-1, 3),
+               fmt='%.17g', delimiter=',')
 
 def load_centroids(filepath):
-    centroids = []
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, 'r') as f:
-        for line in f:
-            if line.strip():
-                centroids.append(list(map(float, line.strip().split(','))))
-    return centroids
+    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        return np.empty((0, 3))
+    return np.loadtxt(filepath, delimiter=',', ndmin=2)
@@ -1,7 +1,10 @@
 from mrjob.job import MRJob
 from mrjob.step import MRStep
 import sys
-from src.math_utils import manhattan_distance
+import numpy as np
+
+# Pixels buffered by the mapper before each vectorized assignment pass
+MAPPER_BATCH_SIZE = 65536
 
 class MRKMeans(MRJob):
     
@@ -13,42 +16,65 @@ class MRKMeans(MRJob):
         # Load centroids from the file passed via --centroids-file
         self.centroids = []
         try:
-            with open(self.options.centroids_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        parts = line.strip().split(',')
-                        self.centroids.append([float(p) for p in parts])
+            self.centroids = np.loadtxt(self.options.centroids_file, delimiter=',', ndmin=2)
         except Exception as e:
             sys.stderr.write(f"Error loading centroids: {e}\n")
 
     def mapper_init(self):
         self.load_centroids()
+        # (K, 3) array so pixels are compared to all centroids at once
+        self.centroid_array = np.array(self.centroids, dtype=np.float32).reshape(-1, 3)
+        k = len(self.centroid_array)
+        
+        # In-mapper combining: per-cluster partial sums and counts
+        self.sums = np.zeros((k, 3), dtype=np.int64)
+        self.counts = np.zeros(k, dtype=np.int64)
+        self.pending = []
+
+    def assign_pending(self):
+        # Assign the buffered pixels in one vectorized pass and fold them
+        # into the per-cluster sums
+        if not self.pending or not len(self.centroid_array):
+            self.pending = []
+            return
+        
+        # 8-bit channels fit in int16; distances are float32 because the
+        # centroids are cluster means
+        pixels = np.array(self.pending, dtype=np.int16)
+        self.pending = []
+        
+        dists = np.abs(pixels[:, None, :] - self.centroid_array[None, :, :]).sum(axis=2)
+        labels = dists.argmin(axis=1)
+        
+        np.add.at(self.sums, labels, pixels)
+        self.counts += np.bincount(labels, minlength=len(self.counts))
 
     def mapper(self, _, line):
         # Input format: row_id, col_id, R, G, B
         try:
             parts = list(map(int, line.strip().split(',')))
-            # parts[0] is row, parts[1] is col
-            pixel = parts[2:] # [R, G, B]
-            
-            min_dist = float('inf')
-            nearest_idx = -1
-            
-            for idx, centroid in enumerate(self.centroids):
-                dist = manhattan_distance(pixel, centroid)
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_idx = idx
-            
-            # Emit: centroid_index, (R, G, B, 1)
-            # We emit 1 to help calculate the average in the reducer
-            yield nearest_idx, (pixel[0], pixel[1], pixel[2], 1)
-            
         except ValueError:
-            pass
+            return
+        if len(parts) != 5:
+            return
+        
+        # parts[0] is row, parts[1] is col
+        self.pending.append(parts[2:]) # [R, G, B]
+        if len(self.pending) >= MAPPER_BATCH_SIZE:
+            self.assign_pending()
+
+    def mapper_final(self):
+        self.assign_pending()
+        
+        # Emit: centroid_index, (sum_R, sum_G, sum_B, count)
+        # One record per non-empty cluster instead of one per pixel
+        for idx in range(len(self.counts)):
+            if self.counts[idx] > 0:
+                r, g, b = self.sums[idx]
+                yield idx, (int(r), int(g), int(b), int(self.counts[idx]))
 
     def reducer(self, key, values):
-        # values is a generator of (R, G, B, 1)
+        # values is a generator of partial (sum_R, sum_G, sum_B, count)
         sum_r, sum_g, sum_b, count = 0, 0, 0, 0
         
         for r, g, b, c in values: